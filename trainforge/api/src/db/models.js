@@ -29,6 +29,7 @@ class JobModel {
             error_message: d.error_message ?? null,
             gpu_id: d.gpu_id ?? null,
             worker_node: d.worker_node ?? null,
+            worker_id: d.worker_id ?? null,
             duration: d.duration ?? null,
             created_at: d.created_at?.toDate?.()?.toISOString() ?? d.created_at ?? null,
             updated_at: d.updated_at?.toDate?.()?.toISOString() ?? d.updated_at ?? null,
@@ -112,6 +113,35 @@ class JobModel {
         }
     }
 
+    /**
+     * Atomically hand a pending job to one worker. Returns the running job, or
+     * null if another worker already owns it (re-claiming your own job is allowed).
+     */
+    async claimJob(jobId, workerId) {
+        try {
+            const ref = this._col().doc(jobId);
+            return await getDB().runTransaction(async (tx) => {
+                const snap = await tx.get(ref);
+                if (!snap.exists) throw new Error('Job not found');
+
+                const d = snap.data();
+                if (d.status !== 'pending' && d.worker_id !== workerId) return null;
+
+                const updates = {
+                    status: 'running',
+                    worker_id: workerId,
+                    started_at: new Date().toISOString(),
+                    updated_at: new Date()
+                };
+                tx.update(ref, updates);
+                return this._format({ exists: true, data: () => ({ ...d, ...updates }) });
+            });
+        } catch (error) {
+            console.error('❌ Error claiming job:', error);
+            throw new Error(`Failed to claim job: ${error.message}`);
+        }
+    }
+
     async listJobs(limit = 50) {
         try {
             const snap = await this._col()
@@ -6,6 +6,7 @@ const router = express.Router();
 const { verifyToken, isAdmin } = require('../middleware/auth');
 const { JobModel } = require('../db/models');
 const { loadBalancer } = require('../services/loadBalancer');
+const { notifyPendingWaiters } = require('./jobs');
 
 // ── In-memory state ────────────────────────────────────────────────────────
 let maintenanceMode = {
@@ -123,6 +124,9 @@ router.put('/jobs/:jobId/status', async (req, res) => {
         }
 
         const updated = await JobModel.updateJob(jobId, updates);
+        if (status === 'pending') {
+            notifyPendingWaiters((updated.is_distributed && updated.num_workers) || 1);
+        }
         console.log(`⚙️ Admin updated job ${jobId} status to ${status}`);
 
         res.json({ success: true, message: 'Job status updated', job: updated });
@@ -5,6 +5,7 @@ const express = require('express');
 const multer = require('multer');
 const path = require('path');
 const fs = require('fs');
+const crypto = require('crypto');
 const { JobModel } = require('../db/models');
 const { FileStorage } = require('../services/storage');
 const { loadBalancer } = require('../services/loadBalancer');
@@ -12,6 +13,88 @@ const { verifyToken } = require('../middleware/auth');
 
 const router = express.Router();
 
+// Long-poll support for GET /pending: workers waiting for work are woken as soon
+// as a job is queued. Kept under the 30s request-timeout middleware in index.js.
+const MAX_PENDING_WAIT_MS = 25000;
+const pendingWaiters = new Set();
+// Bumped on every notify so a poll can tell a job arrived while it was querying
+let pendingGeneration = 0;
+
+// Wake only as many parked polls as the new job can use (one per rank), so idle
+// workers don't all stampede the claim route for the same job
+function notifyPendingWaiters(count = 1) {
+    pendingGeneration++;
+    for (const wake of pendingWaiters) {
+        if (count-- <= 0) break;
+        wake();
+    }
+}
+
+// The claim response carries the archive's sha256 (workers cache extracted
+// projects by it) and, for small archives when the claim body sets
+// `inline_zip: true`, the archive itself so that worker can skip the separate
+// GET /:jobId/files round-trip.
+const MAX_INLINE_ZIP_BYTES = 1024 * 1024;
+
+// sha256 per archive path, reused while the file's mtime and size are unchanged
+// so large archives are not re-read on every claim
+const MAX_HASH_CACHE_ENTRIES = 256;
+const archiveHashCache = new Map();
+
+function cacheArchiveHash(zipPath, stat, hash) {
+    archiveHashCache.delete(zipPath);
+    archiveHashCache.set(zipPath, { mtimeMs: stat.mtimeMs, size: stat.size, hash });
+    if (archiveHashCache.size > MAX_HASH_CACHE_ENTRIES) {
+        archiveHashCache.delete(archiveHashCache.keys().next().value);
+    }
+    return hash;
+}
+
+function projectZipPath(jobId) {
+    return path.join(__dirname, '../../storage/projects/projects', jobId, 'project.zip');
+}
+
+async function projectArchiveInfo(jobId, inline = false) {
+    try {
+        const zipPath = projectZipPath(jobId);
+        const stat = await fs.promises.stat(zipPath);
+        const cached = archiveHashCache.get(zipPath);
+        const cachedHash = cached && cached.mtimeMs === stat.mtimeMs && cached.size === stat.size
+            ? cached.hash : null;
+
+        if (inline && stat.size <= MAX_INLINE_ZIP_BYTES) {
+            const data = await fs.promises.readFile(zipPath);
+            return {
+                file_hash: cachedHash || cacheArchiveHash(zipPath, stat,
+                    crypto.createHash('sha256').update(data).digest('hex')),
+                inline_zip_b64: data.toString('base64')
+            };
+        }
+        if (cachedHash) {
+            return { file_hash: cachedHash, inline_zip_b64: null };
+        }
+        const hash = crypto.createHash('sha256');
+        for await (const chunk of fs.createReadStream(zipPath)) hash.update(chunk);
+        return { file_hash: cacheArchiveHash(zipPath, stat, hash.digest('hex')), inline_zip_b64: null };
+    } catch (error) {
+        // Worker falls back to GET /:jobId/files without caching
+        return { file_hash: null, inline_zip_b64: null };
+    }
+}
+
+function waitForPendingJob(res, waitMs) {
+    return new Promise(resolve => {
+        const wake = () => {
+            clearTimeout(timer);
+            pendingWaiters.delete(wake);
+            resolve();
+        };
+        const timer = setTimeout(wake, waitMs);
+        pendingWaiters.add(wake);
+        res.on('close', wake);
+    });
+}
+
 // Configure multer for file uploads
 const upload = multer({
     dest: 'uploads/',
@@ -64,7 +147,7 @@ router.post('/', verifyToken, upload.single('project_zip'), async (req, res) =>
         // Clean up uploaded file
         fs.unlinkSync(req.file.path);
 
-        // TODO: Add job to processing queue
+        notifyPendingWaiters();
         console.log('📋 Job queued for processing');
 
         res.status(201).json({
@@ -129,6 +212,7 @@ router.post('/distributed', verifyToken, upload.single('project_zip'), async (re
         // Clean up uploaded file
         fs.unlinkSync(req.file.path);
 
+        notifyPendingWaiters(numWorkers);
         console.log(`📋 Distributed Job queued for processing across ${numWorkers} workers`);
 
         res.status(201).json({
@@ -190,11 +274,32 @@ router.get('/', verifyToken, async (req, res) => {
 });
 
 // GET /api/jobs/pending - Get pending jobs for workers (MUST BE BEFORE /:jobId)
+// Optional ?wait=<seconds> holds the request open until a job is queued (long-poll);
+// optional ?limit=<n> caps the list (workers only ever take the first job)
 router.get('/pending', async (req, res) => {
     try {
-        // Get jobs with status 'pending'
-        const jobs = await JobModel.listJobs(100); // Get more jobs for filtering
-        const pendingJobs = jobs.filter(job => job.status === 'pending');
+        const listPending = async () => {
+            const jobs = await JobModel.listJobs(100); // Get more jobs for filtering
+            return jobs.filter(job => job.status === 'pending');
+        };
+
+        const generation = pendingGeneration;
+        let pendingJobs = await listPending();
+
+        const waitMs = Math.min((parseFloat(req.query.wait) || 0) * 1000, MAX_PENDING_WAIT_MS);
+        if (pendingJobs.length === 0 && waitMs > 0) {
+            // Skip the wait if a job was queued while the query above was running
+            if (generation === pendingGeneration) {
+                await waitForPendingJob(res, waitMs);
+            }
+            if (res.headersSent || res.destroyed) return;
+            pendingJobs = await listPending();
+        }
+
+        const limit = parseInt(req.query.limit) || 0;
+        if (limit > 0) {
+            pendingJobs = pendingJobs.slice(0, limit);
+        }
 
         res.json(pendingJobs);
 
@@ -261,6 +366,9 @@ router.put('/:jobId', verifyToken, async (req, res) => {
         }
 
         const updatedJob = await JobModel.updateJob(jobId, updates);
+        if (updates.status === 'pending') {
+            notifyPendingWaiters((updatedJob.is_distributed && updatedJob.num_workers) || 1);
+        }
 
         res.json({
             success: true,
@@ -360,7 +468,7 @@ router.delete('/:jobId', verifyToken, async (req, res) => {
 router.post('/:jobId/claim', async (req, res) => {
     try {
         const { jobId } = req.params;
-        const { worker_id } = req.body;
+        const { worker_id, inline_zip } = req.body;
 
         if (!worker_id) {
             return res.status(400).json({ error: 'worker_id is required' });
@@ -408,6 +516,7 @@ router.post('/:jobId/claim', async (req, res) => {
                 message: 'Distributed job claimed successfully',
                 job_id: jobId,
                 worker_id: worker_id,
+                ...(await projectArchiveInfo(jobId, inline_zip === true)),
                 is_distributed: true,
                 dist_config: {
                     rank: rank,
@@ -418,12 +527,11 @@ router.post('/:jobId/claim', async (req, res) => {
             });
         }
 
-        // Standard job logic
-        const updatedJob = await JobModel.updateJob(jobId, {
-            status: 'running',
-            worker_id: worker_id,
-            started_at: new Date().toISOString()
-        });
+        // Standard job logic - the pending check and the update run in one transaction
+        const updatedJob = await JobModel.claimJob(jobId, worker_id);
+        if (!updatedJob) {
+            return res.status(409).json({ error: 'Job already claimed' });
+        }
 
         // Track job assignment in load balancer
         loadBalancer.assignJob(jobId, worker_id);
@@ -434,7 +542,8 @@ router.post('/:jobId/claim', async (req, res) => {
             success: true,
             message: 'Job claimed successfully',
             job_id: jobId,
-            worker_id: worker_id
+            worker_id: worker_id,
+            ...(await projectArchiveInfo(jobId, inline_zip === true))
         });
 
     } catch (error) {
@@ -469,6 +578,9 @@ router.put('/:jobId/status', async (req, res) => {
         }
 
         const updatedJob = await JobModel.updateJob(jobId, updates);
+        if (status === 'pending') {
+            notifyPendingWaiters((updatedJob.is_distributed && updatedJob.num_workers) || 1);
+        }
 
         console.log(`📊 Job ${jobId} status updated to ${status}`);
 
@@ -500,8 +612,7 @@ router.get('/:jobId/files', async (req, res) => {
         const job = await JobModel.getJob(jobId);
 
         // Path to project files
-        const projectPath = path.join(__dirname, '../../storage/projects/projects', jobId);
-        const zipPath = path.join(projectPath, 'project.zip');
+        const zipPath = projectZipPath(jobId);
 
         // Check if zip file exists
         if (!fs.existsSync(zipPath)) {
@@ -890,6 +1001,7 @@ router.post('/distributed', upload.single('project_zip'), async (req, res) => {
             status: 'pending',
             created_at: new Date()
         });
+        notifyPendingWaiters(numWorkers);
 
         res.status(201).json({
             success: true,
@@ -1033,4 +1145,6 @@ router.get('/:jobId/distributed/results', async (req, res) => {
     }
 });
 
-module.exports = router;
\ No newline at end of file
+module.exports = router;
+// Lets other routers that put a job back to pending wake parked /pending polls
+module.exports.notifyPendingWaiters = notifyPendingWaiters;
@@ -6,6 +6,7 @@ const router = express.Router();
 const { ObjectId } = require('mongodb');
 const mongoDB = require('../db/mongodb');
 const { loadBalancer, LoadBalancingStrategy } = require('../services/loadBalancer');
+const { JobModel } = require('../db/models');
 const { verifyToken, isAdmin } = require('../middleware/auth');
 
 // In-memory storage for workers (now managed by load balancer)
@@ -307,17 +308,55 @@ router.put('/:worker_id/status', (req, res) => {
 });
 
 // Worker heartbeat
-router.post('/:worker_id/heartbeat', (req, res) => {
+// Workers may piggyback a non-terminal job status change as `status_update`.
+// Terminal statuses must go through PUT /api/jobs/:jobId/status, a late
+// heartbeat never reopens a job that has already finished, and updates for
+// jobs the worker doesn't own are ignored.
+const TERMINAL_JOB_STATUSES = new Set(['completed', 'failed', 'cancelled']);
+
+router.post('/:worker_id/heartbeat', async (req, res) => {
     try {
         const { worker_id } = req.params;
+        const { status_update } = req.body || {};
 
         loadBalancer.updateHeartbeat(worker_id);
 
+        let statusUpdateApplied = false;
+        let statusUpdateIgnored = false;
+        if (status_update?.job_id && status_update.status) {
+            try {
+                if (TERMINAL_JOB_STATUSES.has(status_update.status)) {
+                    statusUpdateIgnored = true;
+                } else {
+                    const job = await JobModel.getJob(status_update.job_id);
+                    // Only a worker that owns the job may move it (a stale beat from
+                    // a worker that lost the job must not touch one running elsewhere)
+                    const ownsJob = job.worker_id === worker_id ||
+                        (job.is_distributed && job.allocated_workers.includes(worker_id));
+                    if (TERMINAL_JOB_STATUSES.has(job.status) || !ownsJob) {
+                        statusUpdateIgnored = true;
+                    } else {
+                        const updates = { status: status_update.status };
+                        if (status_update.message) {
+                            updates.message = status_update.message;
+                        }
+                        await JobModel.updateJob(status_update.job_id, updates);
+                        statusUpdateApplied = true;
+                    }
+                }
+            } catch (error) {
+                // Worker keeps the update and resends it with the next heartbeat
+                console.error('⚠️ Heartbeat status update failed:', error.message);
+            }
+        }
+
         res.json({
             success: true,
             message: 'Heartbeat received',
             worker_id: worker_id,
-            timestamp: Date.now()
+            timestamp: Date.now(),
+            status_update_applied: statusUpdateApplied,
+            status_update_ignored: statusUpdateIgnored
         });
     } catch (error) {
         console.error('❌ Heartbeat error:', error);
@@ -14,7 +14,9 @@ PASTE THIS INTO COLAB (one cell):
         exec(compile(r.read().decode(), 'colab_worker.py', 'exec'))
 """
 
-import os, sys, time, json, signal, shutil, subprocess, zipfile, threading
+import os, re, sys, io, time, random, json, gzip, base64, hashlib, queue, signal, shutil, subprocess, tempfile, zipfile, threading
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
 
 try:
@@ -23,6 +25,19 @@ except ImportError:
     subprocess.run([sys.executable, '-m', 'pip', 'install', 'requests', '-q'], check=True)
     import requests
 
+try:
+    import orjson   # optional C-accelerated JSON for log uploads and API responses
+    _json_bytes = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_bytes(obj):
+        return json.dumps(obj).encode()
+    _json_loads = json.loads
+
+def _fast_json(resp):
+    """Parse a response body straight from bytes (skips resp.text decoding)."""
+    return _json_loads(resp.content)
+
 # ─── Config ───────────────────────────────────────────────────────────────────
 API_URL   = os.environ.get('TRAINFORGE_API_URL', '').strip().rstrip('/')
 WORKER_ID = f"colab-{int(time.time())}"
@@ -35,42 +50,132 @@ HEADERS = {
     'Content-Type': 'application/json',
 }
 
-log_buffer = []
+# One keep-alive pool for every API call (retries are handled in _req)
+SESSION = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=0)
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+
+# Notebook echo of training output is rate-limited; the API still gets every line
+PRINT_INTERVAL = 0.2   # seconds
+ALWAYS_PRINT = re.compile(r'error|exception|traceback|epoch|warn', re.IGNORECASE)
+
+# Job launch invariants, built once
+BASE_ENV = os.environ.copy()
+TORCHRUN = (sys.executable, '-m', 'torch.distributed.run', '--nproc_per_node=1')
+
+# Extracted project archives, keyed by sha256 from the claim response
+CACHE_DIR  = WORK_DIR / 'cache'
+CACHE_KEEP = 4
+
+# requirements.txt digests already installed into this runtime
+installed_requirements = set()
+
+LOG_BUFFER_MAX = 8192
+log_buffer = deque(maxlen=LOG_BUFFER_MAX)   # oldest lines drop first if the API falls behind
+log_dropped = 0
+log_bytes = 0
 log_lock = threading.Lock()
+LOG_FLUSH_INTERVAL = 3          # seconds — upper bound on log latency
+LOG_BATCH_LINES = 256           # …or flush early once this many lines
+LOG_BATCH_BYTES = 64 * 1024     # …or this much text is waiting
+log_flush_event = threading.Event()
+
+# Fire-and-forget calls that fail are retried here instead of on the caller's thread
+retry_queue = queue.Queue(maxsize=1024)
 
 # ─── Keep Colab alive (prevents idle disconnect) ─────────────────────────────
-def _keep_alive():
+KEEP_ALIVE_EVERY = 240   # seconds
+
+def _keep_alive_tick(*_):
     """Outputs a heartbeat every 4 minutes so Colab doesn't idle-disconnect."""
-    while True:
-        time.sleep(240)
+    try:
         print(f"\r⏳ [keep-alive] {time.strftime('%H:%M:%S')} — worker running…", flush=True)
+    except RuntimeError:
+        pass   # interrupted another write to stdout — the next tick will do
+
+def _keep_alive():
+    while True:
+        time.sleep(KEEP_ALIVE_EVERY)
+        _keep_alive_tick()
 
-threading.Thread(target=_keep_alive, daemon=True).start()
+try:
+    # Interval timer on the main thread — no extra thread just to tickle stdout
+    signal.signal(signal.SIGALRM, _keep_alive_tick)
+    signal.setitimer(signal.ITIMER_REAL, KEEP_ALIVE_EVERY, KEEP_ALIVE_EVERY)
+except (AttributeError, ValueError):
+    # No SIGALRM on this platform, or not exec'd on the main thread
+    threading.Thread(target=_keep_alive, daemon=True).start()
 
 # ─── HTTP helpers ─────────────────────────────────────────────────────────────
-def _req(method, path, max_retries=3, **kwargs):
+def _req(method, path, max_retries=3, background_retry=False, _attempt=0, **kwargs):
+    """With background_retry, a failed call is handed to the retry thread and
+    None is returned at once, so heartbeats and polling are never held up."""
     url = f"{API_URL}{path}"
     kwargs.setdefault('timeout', 20)
+    retry_kwargs = dict(kwargs)
     # Merge default headers
     h = {**HEADERS, **kwargs.pop('headers', {})}
     if 'files' in kwargs:
         h = {k: v for k, v in h.items() if k != 'Content-Type'}
-    for attempt in range(max_retries):
+    for attempt in range(_attempt, max_retries):
         try:
-            return requests.request(method, url, headers=h, **kwargs)
+            return SESSION.request(method, url, headers=h, **kwargs)
         except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                wait = 2 ** attempt
-                print(f"   ⏳ Retry {attempt+1}/{max_retries} in {wait}s ({e})")
-                time.sleep(wait)
+            if attempt >= max_retries - 1:
+                break
+            if background_retry:
+                try:
+                    retry_queue.put_nowait((method, path, max_retries, attempt + 1, retry_kwargs))
+                except queue.Full:
+                    print(f"   ⚠️  Retry queue full — dropping {method} {path}")
+                return None
+            wait = random.uniform(0, min(20, 2 ** (attempt + 1)))   # full jitter
+            print(f"   ⏳ Retry {attempt+1}/{max_retries} in {wait:.1f}s ({e})")
+            time.sleep(wait)
     return None
 
+def _retry_sender():
+    while True:
+        method, path, max_retries, attempt, kwargs = retry_queue.get()
+        time.sleep(random.uniform(0, min(20, 2 ** attempt)))
+        _req(method, path, max_retries, background_retry=True, _attempt=attempt, **kwargs)
+
+threading.Thread(target=_retry_sender, daemon=True).start()
+
 # ─── Worker actions ───────────────────────────────────────────────────────────
 def test_connection():
     r = _req('GET', '/health', max_retries=2)
     return r is not None and r.status_code == 200
 
+def _gpu_info_from_nvml():
+    """Read GPU 0 through NVML — no CUDA context, no torch import."""
+    import pynvml
+    pynvml.nvmlInit()
+    try:
+        if pynvml.nvmlDeviceGetCount() == 0:
+            return None
+        handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+        name = pynvml.nvmlDeviceGetName(handle)
+        cuda = pynvml.nvmlSystemGetCudaDriverVersion()
+        return {
+            'available': True,
+            'name': name.decode('utf-8') if isinstance(name, bytes) else name,
+            'memory_gb': round(pynvml.nvmlDeviceGetMemoryInfo(handle).total / 1024**3, 1),
+            'cuda': f"{cuda // 1000}.{cuda % 1000 // 10}",
+        }
+    finally:
+        pynvml.nvmlShutdown()
+
+@lru_cache(maxsize=None)
 def get_gpu_info():
+    """Probe the GPU once; the runtime's device never changes while the worker lives."""
+    try:
+        info = _gpu_info_from_nvml()
+        if info:
+            return info
+    except Exception:
+        pass   # pynvml missing or NVML unusable — fall back to torch
     try:
         import torch
         if torch.cuda.is_available():
@@ -84,9 +189,11 @@ def get_gpu_info():
         pass
     return {'available': False, 'name': 'CPU only', 'memory_gb': 0}
 
-def register():
+@lru_cache(maxsize=None)
+def registration_payload():
+    """Encoded once — register() runs again on every reconnect."""
     gpu = get_gpu_info()
-    data = {
+    return _json_bytes({
         'worker_id':   WORKER_ID,
         'status':      'idle',
         'worker_type': 'external_colab',
@@ -98,100 +205,203 @@ def register():
             'gpu_info':   gpu,
             'max_memory_gb': gpu['memory_gb'],
         },
-    }
-    r = _req('POST', '/api/workers/register', json=data)
+    })
+
+def register():
+    r = _req('POST', '/api/workers/register', data=registration_payload())
     return r is not None and r.status_code in (200, 201)
 
+HEARTBEAT_EVERY = 25   # seconds
+
+# Latest non-terminal status change, delivered with the next heartbeat
+pending_status = None
+status_lock = threading.Lock()
+
 def heartbeat(current_job=None):
+    global pending_status
     payload = {'timestamp': time.time()}
     if current_job:
         payload['current_job_id'] = current_job
+    with status_lock:
+        update = pending_status
+    if update:
+        payload['status_update'] = update
     r = _req('POST', f'/api/workers/{WORKER_ID}/heartbeat', json=payload, max_retries=1)
-    return r is not None and r.status_code == 200
+    ok = r is not None and r.status_code == 200
+    if ok and update:
+        try:
+            body = _fast_json(r)
+        except ValueError:
+            body = None   # proxy/HTML page instead of JSON — treat as no directive
+        if not isinstance(body, dict):
+            return ok
+        # Ignored means the server refused a stale update; either way stop resending it
+        if not (body.get('status_update_applied') or body.get('status_update_ignored')):
+            return ok
+        with status_lock:
+            if pending_status is update:
+                pending_status = None
+    return ok
+
+def job_heartbeat(job_id, stop_event):
+    """Keep heartbeats (and queued status changes) flowing while a job runs."""
+    while not stop_event.is_set():
+        heartbeat(job_id)
+        stop_event.wait(HEARTBEAT_EVERY)
 
-def poll_jobs():
-    r = _req('GET', '/api/jobs/pending', max_retries=1)
+POLL_WAIT = 25   # seconds the API may hold a /pending long-poll open
+
+def poll_jobs(wait=POLL_WAIT):
+    r = _req('GET', '/api/jobs/pending', max_retries=1,
+             params={'wait': wait, 'limit': 1}, timeout=wait + 5)
     if r and r.status_code == 200:
-        jobs = r.json()
+        jobs = _fast_json(r)
         if isinstance(jobs, list):
             return jobs
     return []
 
 def claim_job(job_id):
-    r = _req('POST', f'/api/jobs/{job_id}/claim', json={'worker_id': WORKER_ID})
+    # Ask for small archives inline so download_files() can skip the /files round-trip
+    r = _req('POST', f'/api/jobs/{job_id}/claim', json={'worker_id': WORKER_ID, 'inline_zip': True})
     if r and r.status_code == 200:
-        return r.json()
+        return _fast_json(r)
     return None
 
 def update_status(job_id, status, message=None):
+    global pending_status
     data = {'status': status}
     if message:
         data['message'] = message
-    _req('PUT', f'/api/jobs/{job_id}/status', json=data, max_retries=2)
+    if status in ('completed', 'failed', 'cancelled'):
+        # Terminal transitions go out immediately and supersede anything queued
+        with status_lock:
+            pending_status = None
+        _req('PUT', f'/api/jobs/{job_id}/status', json=data, max_retries=3, background_retry=True)
+    else:
+        with status_lock:
+            pending_status = {'job_id': job_id, **data}
 
-def send_log(job_id, msg):
+def send_logs(job_id, lines):
+    """Queue a chunk of output lines under one lock; dicts are built at flush time."""
+    global log_dropped, log_bytes
+    ts = time.time()
     with log_lock:
-        log_buffer.append({'message': msg, 'timestamp': time.time()})
+        log_dropped += max(0, len(log_buffer) + len(lines) - LOG_BUFFER_MAX)
+        log_buffer.extend((msg, ts) for msg in lines)
+        log_bytes += sum(map(len, lines))
+        if len(log_buffer) >= LOG_BATCH_LINES or log_bytes >= LOG_BATCH_BYTES:
+            log_flush_event.set()
 
 def flush_logs(job_id):
+    global log_dropped, log_bytes
     with log_lock:
         if not log_buffer:
             return
-        batch = log_buffer[:]
+        batch = [{'message': msg, 'timestamp': ts} for msg, ts in log_buffer]
         log_buffer.clear()
-        
+        log_bytes = 0
+        if log_dropped:
+            batch.insert(0, {'message': f'[worker] {log_dropped} log lines dropped (buffer full)',
+                             'timestamp': time.time()})
+            log_dropped = 0
+
     if batch:
-        _req('POST', f'/api/jobs/{job_id}/logs/batch', json={'logs': batch}, max_retries=2)
+        # Training logs are highly repetitive; gzip them (express.json inflates
+        # Content-Encoding: gzip bodies transparently)
+        body = _json_bytes({'logs': batch})
+        headers = {}
+        if len(body) > 1024:
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+        _req('POST', f'/api/jobs/{job_id}/logs/batch', data=body, headers=headers,
+             max_retries=3, background_retry=True)
 
 def log_flusher(job_id, stop_event):
     while not stop_event.is_set():
+        log_flush_event.wait(timeout=LOG_FLUSH_INTERVAL)
+        log_flush_event.clear()
         flush_logs(job_id)
-        time.sleep(3)
     flush_logs(job_id)
 
-def download_files(job_id):
+def _fetch_archive(job_id, dest, inline_zip=None):
+    """Extract the job's project archive into dest; False if the API had none."""
+    if inline_zip:
+        # Small archives arrive base64-encoded in the claim response
+        with zipfile.ZipFile(io.BytesIO(base64.b64decode(inline_zip))) as zf:
+            zf.extractall(dest)
+        return True
     r = _req('GET', f'/api/jobs/{job_id}/files', stream=True, timeout=120)
     if not r or r.status_code != 200:
-        return WORK_DIR / job_id   # empty dir — demo/mock mode
+        return False
+    # Spool into an anonymous temp file (never visible in WORK_DIR, freed on close)
+    with r, tempfile.TemporaryFile(dir=str(WORK_DIR)) as tf:
+        r.raw.decode_content = True
+        shutil.copyfileobj(r.raw, tf, 1 << 20)
+        tf.seek(0)
+        with zipfile.ZipFile(tf) as zf:
+            zf.extractall(dest)
+    return True
+
+def _prune_cache():
+    entries = sorted((p for p in CACHE_DIR.iterdir() if not p.name.endswith('.tmp')),
+                     key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in entries[CACHE_KEEP:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+def download_files(job_id, inline_zip=None, file_hash=None):
     job_dir = WORK_DIR / job_id
-    job_dir.mkdir(exist_ok=True)
-    zip_path = WORK_DIR / f'{job_id}.zip'
-    with open(zip_path, 'wb') as f:
-        for chunk in r.iter_content(8192):
-            f.write(chunk)
-    with zipfile.ZipFile(zip_path) as zf:
-        zf.extractall(job_dir)
-    zip_path.unlink()
+    if not file_hash:
+        job_dir.mkdir(exist_ok=True)
+        _fetch_archive(job_id, job_dir, inline_zip)   # empty dir on failure — demo/mock mode
+        return job_dir
+
+    # Extracted projects are cached by archive hash so retried jobs skip the download
+    cached = CACHE_DIR / file_hash
+    if cached.exists():
+        print("📦 Project files cached — skipping download")
+        os.utime(cached)
+    else:
+        tmp = CACHE_DIR / f'{file_hash}.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        if not _fetch_archive(job_id, tmp, inline_zip):
+            shutil.rmtree(tmp, ignore_errors=True)
+            job_dir.mkdir(exist_ok=True)
+            return job_dir
+        os.rename(tmp, cached)
+        _prune_cache()
+    # Copy rather than symlink: training writes outputs into job_dir
+    shutil.copytree(cached, job_dir, dirs_exist_ok=True)
     return job_dir
 
 def run_training(job_id, job_dir, dist_config=None):
-    for name in ['train.py', 'main.py', 'run.py']:
-        script = job_dir / name
-        if script.exists():
-            break
-    else:
-        py = list(job_dir.glob('*.py'))
-        if not py:
-            raise FileNotFoundError('No training script found in job directory')
-        script = py[0]
+    # One directory scan; prefer the conventional entry points, else any .py file
+    with os.scandir(job_dir) as it:
+        py = {e.name: e.path for e in it if e.name.endswith('.py') and e.is_file()}
+    name = next((n for n in ('train.py', 'main.py', 'run.py') if n in py), None) or next(iter(py), None)
+    if name is None:
+        raise FileNotFoundError('No training script found in job directory')
+    script = Path(py[name])
 
     print(f"📜 Running: {script.name}")
     
     cmd = [sys.executable, str(script)]
-    env = os.environ.copy()
+    env = BASE_ENV
 
     if dist_config:
         print(f"🔗 Launching via torchrun (Distributed Mode)")
         print(f"   Rank: {dist_config.get('rank')} / {dist_config.get('world_size') - 1}")
         print(f"   Master: {dist_config.get('master_addr')}:{dist_config.get('master_port')}")
         
-        env['MASTER_ADDR'] = str(dist_config.get('master_addr', '127.0.0.1'))
-        env['MASTER_PORT'] = str(dist_config.get('master_port', 29500))
-        env['NODE_RANK']   = str(dist_config.get('rank', 0))
-        env['WORLD_SIZE']  = str(dist_config.get('world_size', 1))
-
-        cmd = [sys.executable, '-m', 'torch.distributed.run',
-               '--nproc_per_node=1',
+        env = {
+            **BASE_ENV,
+            'MASTER_ADDR': str(dist_config.get('master_addr', '127.0.0.1')),
+            'MASTER_PORT': str(dist_config.get('master_port', 29500)),
+            'NODE_RANK':   str(dist_config.get('rank', 0)),
+            'WORLD_SIZE':  str(dist_config.get('world_size', 1)),
+        }
+
+        cmd = [*TORCHRUN,
                f"--nnodes={dist_config.get('world_size', 1)}",
                f"--node_rank={dist_config.get('rank', 0)}",
                f"--master_addr={dist_config.get('master_addr', '127.0.0.1')}",
@@ -205,46 +415,83 @@ def run_training(job_id, job_dir, dist_config=None):
     try:
         proc = subprocess.Popen(
             cmd, cwd=str(job_dir), env=env,
-            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0
         )
-        for line in proc.stdout:
-            line = line.rstrip()
-            if line:
-                print(f"  {line}", flush=True)
-                send_log(job_id, line)
+        # Drain the pipe in large raw reads and split lines ourselves; '\r' counts
+        # as a line break so progress-bar redraws still come through one by one.
+        fd = proc.stdout.fileno()
+        tail = b''
+        last_print = 0.0
+        while True:
+            chunk = os.read(fd, 1 << 16)
+            if chunk:
+                *lines, tail = (tail + chunk).replace(b'\r', b'\n').split(b'\n')
+            else:
+                lines, tail = [tail], b''   # EOF — emit any unterminated last line
+            out = [l for l in (raw.decode('utf-8', 'replace').rstrip() for raw in lines) if l]
+            if out:
+                now = time.monotonic()
+                shown = [l for l in out if ALWAYS_PRINT.search(l)]
+                if (now - last_print >= PRINT_INTERVAL or not chunk) and out[-1] not in shown:
+                    shown.append(out[-1])
+                if shown:
+                    print('\n'.join(f"  {l}" for l in shown), flush=True)
+                    last_print = now
+                send_logs(job_id, out)
+            if not chunk:
+                break
+        proc.stdout.close()
         return proc.wait() == 0
     finally:
         stop_event.set()
+        log_flush_event.set()
         flusher_thread.join(timeout=5)
 
 def execute_job(job):
     job_id = job.get('job_id') or job.get('_id')
     job_dir = None
+    hb_stop = threading.Event()
+    hb_thread = None
+    final_status = None
     try:
         print(f"\n{'='*55}")
         print(f"🎯 Job: {job_id}")
         print(f"{'='*55}")
         update_status(job_id, 'running', 'Initializing…')
+        hb_thread = threading.Thread(target=job_heartbeat, args=(job_id, hb_stop), daemon=True)
+        hb_thread.start()
 
-        job_dir = download_files(job_id)
+        job_dir = download_files(job_id, job.get('inline_zip_b64'), job.get('file_hash'))
         req_file = job_dir / 'requirements.txt'
         if req_file.exists():
-            update_status(job_id, 'running', 'Installing deps…')
-            subprocess.run([sys.executable, '-m', 'pip', 'install', '-q', '-r', str(req_file)],
-                           check=True, capture_output=True)
+            digest = hashlib.sha256(req_file.read_bytes()).hexdigest()
+            if digest in installed_requirements:
+                print("📦 Requirements unchanged since last job — skipping pip install")
+            else:
+                update_status(job_id, 'running', 'Installing deps…')
+                subprocess.run([sys.executable, '-m', 'pip', 'install', '-q', '-r', str(req_file)],
+                               check=True, capture_output=True,
+                               close_fds=False)   # lets CPython use posix_spawn (fds are non-inheritable anyway)
+                installed_requirements.add(digest)
 
         update_status(job_id, 'running', 'Training…')
         success = run_training(job_id, job_dir, job.get('dist_config'))
 
         if success:
-            update_status(job_id, 'completed', 'Training completed ✅')
+            final_status = ('completed', 'Training completed ✅')
             print(f"✅ Job {job_id} completed")
         else:
-            update_status(job_id, 'failed', 'Training script exited with non-zero code')
+            final_status = ('failed', 'Training script exited with non-zero code')
     except Exception as e:
         print(f"❌ Job error: {e}")
-        update_status(job_id, 'failed', str(e))
+        final_status = ('failed', str(e))
     finally:
+        # Let any in-flight heartbeat land first so it can't reopen the finished job
+        hb_stop.set()
+        if hb_thread:
+            hb_thread.join(timeout=30)
+        if final_status:
+            update_status(job_id, *final_status)
         if job_dir and job_dir.exists():
             shutil.rmtree(job_dir, ignore_errors=True)
 
@@ -265,7 +512,6 @@ def main():
 
     RECONNECT_DELAY  = 5    # seconds between reconnect attempts
     MAX_DELAY        = 120  # cap at 2 minutes
-    HEARTBEAT_EVERY  = 25   # seconds
     current_job      = None
 
     while True:   # ← outer loop: reconnect forever on any failure
@@ -302,7 +548,10 @@ def main():
                     last_hb = now
 
                 if current_job is None:
-                    jobs = poll_jobs()
+                    # Never park the long-poll past the next idle heartbeat
+                    wait = max(0.0, min(POLL_WAIT, HEARTBEAT_EVERY - (time.time() - last_hb)))
+                    polled_at = time.time()
+                    jobs = poll_jobs(wait)
                     if jobs:
                         job = jobs[0]
                         jid = job.get('job_id') or job.get('_id')
@@ -310,10 +559,13 @@ def main():
                         if claim_res and claim_res.get('success'):
                             job['dist_config'] = claim_res.get('dist_config')
                             job['is_distributed'] = claim_res.get('is_distributed', False)
+                            job['inline_zip_b64'] = claim_res.get('inline_zip_b64')
+                            job['file_hash'] = claim_res.get('file_hash')
                             current_job = jid
                             execute_job(job)
                             current_job = None
-                    else:
+                    elif wait >= 1 and time.time() - polled_at < 1:
+                        # API answered without holding the long-poll (older server / error)
                         time.sleep(5)
                 else:
                     time.sleep(2)
@@ -15,21 +15,61 @@ import os
 import sys
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import subprocess
-import tempfile
 import zipfile
 from pathlib import Path
 import threading
-import signal
 import shutil
+import queue
+import random
+from functools import lru_cache
+
+LOG_BATCH_SIZE = 50
+LOG_FLUSH_INTERVAL = 0.5
+LOG_DRAIN_TIMEOUT = 10.0  # max seconds a finished job waits for its queued logs to ship
+HEARTBEAT_INTERVAL = 30
+MIN_POLL_INTERVAL = 1.0
+MAX_POLL_INTERVAL = 30.0
+POLL_WAIT = 25  # seconds the API may hold a /pending long-poll open
+
+@lru_cache(maxsize=None)
+def _probe_gpu():
+    """Query torch/CUDA once; the device can't change during a notebook session."""
+    print("\n💻 Detecting GPU...")
+    try:
+        import torch
+        if torch.cuda.is_available():
+            gpu_name = torch.cuda.get_device_name(0)
+            gpu_memory = torch.cuda.get_device_properties(0).total_memory / (1024**3)
+            print(f"✅ GPU Available: {gpu_name}")
+            print(f"   GPU Memory: {gpu_memory:.2f} GB")
+            print(f"   CUDA Version: {torch.version.cuda}")
+            return {
+                'available': True,
+                'name': gpu_name,
+                'memory_gb': gpu_memory,
+                'cuda_version': torch.version.cuda
+            }
+        else:
+            print("⚠️ No GPU detected - running on CPU")
+            return {'available': False}
+    except ImportError:
+        print("⚠️ PyTorch not installed - cannot detect GPU")
+        return {'available': False}
 
 class KaggleGPUWorker:
     def __init__(self, api_url, worker_id=None):
         self.api_url = api_url.rstrip('/')
         self.worker_id = worker_id or f"kaggle-{int(time.time())}"
         self.running = False
+        self.stop_event = threading.Event()  # Wakes sleeping loops immediately on stop()
         self.current_job = None
+        self.poll_interval = MIN_POLL_INTERVAL
+        self.pending_etag = None
+        self.pending_jobs = []
 
         # Setup headers for ngrok compatibility
         self.headers = {
@@ -37,10 +77,28 @@ class KaggleGPUWorker:
             'User-Agent': 'TrainForge-Worker/1.0'
         }
 
+        # Reuse one keep-alive connection pool for every API call. Connection and
+        # read failures are retried only by make_request(); the adapter just
+        # re-asks idempotent calls that the tunnel answered with a gateway error
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=2, connect=0, read=0, status=2, backoff_factor=0.3,
+                              status_forcelist=[502, 503, 504], raise_on_status=False)
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(self.headers)
+
         # Setup work directory (Kaggle uses /kaggle/working as the main directory)
         self.work_dir = Path("/kaggle/working/trainforge_work")
         self.work_dir.mkdir(exist_ok=True)
 
+        # Training output is shipped to the API in batches by a background thread
+        self.log_queue = queue.Queue(maxsize=10000)
+        threading.Thread(target=self.send_logs, daemon=True).start()
+
         print(f"🚀 TrainForge Kaggle Worker: {self.worker_id}")
         print(f"📡 API URL: {self.api_url}")
         print(f"📁 Work directory: {self.work_dir}")
@@ -49,33 +107,14 @@ class KaggleGPUWorker:
         """Make HTTP request with proper headers and retry logic"""
         url = f"{self.api_url}{endpoint}"
 
-        # Merge headers (unless files are being uploaded)
-        if 'files' not in kwargs:
-            request_headers = kwargs.get('headers', {})
-            request_headers.update(self.headers)
-            kwargs['headers'] = request_headers
-        else:
-            # For file uploads, only use provided headers
-            if 'headers' not in kwargs:
-                kwargs['headers'] = {}
-            # Add ngrok skip header
-            kwargs['headers']['ngrok-skip-browser-warning'] = 'true'
+        # Default headers live on the session; requests merges any per-call extras
 
         # Add timeout
         kwargs.setdefault('timeout', 30)
 
         for attempt in range(max_retries):
             try:
-                if method.upper() == 'GET':
-                    response = requests.get(url, **kwargs)
-                elif method.upper() == 'POST':
-                    response = requests.post(url, **kwargs)
-                elif method.upper() == 'PUT':
-                    response = requests.put(url, **kwargs)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-
-                return response
+                return self.session.request(method, url, **kwargs)
 
             except requests.exceptions.Timeout:
                 print(f"⏰ Timeout on attempt {attempt + 1}/{max_retries} for {endpoint}")
@@ -87,9 +126,11 @@ class KaggleGPUWorker:
                 print(f"❌ Unexpected error on attempt {attempt + 1}/{max_retries}: {e}")
 
             if attempt < max_retries - 1:
-                wait_time = (attempt + 1) * 2  # Exponential backoff
-                print(f"   ⏳ Waiting {wait_time} seconds before retry...")
-                time.sleep(wait_time)
+                # Exponential backoff with full jitter so workers sharing a tunnel don't retry in lockstep
+                wait_time = random.uniform(0, min(20, 2 ** (attempt + 1)))
+                print(f"   ⏳ Waiting {wait_time:.1f} seconds before retry...")
+                if self.stop_event.wait(wait_time):
+                    break
 
         print(f"❌ All {max_retries} attempts failed for {endpoint}")
         return None
@@ -98,8 +139,8 @@ class KaggleGPUWorker:
         """Test connection to TrainForge API with comprehensive checks"""
         print("🔍 Testing API connection...")
 
-        # Test 1: Basic connectivity
-        print("   Step 1: Testing basic connectivity...")
+        # Basic connectivity
+        print("   Testing basic connectivity...")
         response = self.make_request('GET', '/health', max_retries=2)
         if not response:
             print("   ❌ Cannot reach API")
@@ -111,45 +152,13 @@ class KaggleGPUWorker:
 
         print("   ✅ Basic connectivity OK")
 
-        # Test 2: Check API endpoints
-        print("   Step 2: Testing job endpoints...")
-        response = self.make_request('GET', '/api/jobs/pending', max_retries=2)
-        if not response:
-            print("   ❌ Cannot access job endpoints")
-            return False
-
-        if response.status_code != 200:
-            print(f"   ❌ Jobs endpoint returned: {response.status_code}")
-            return False
-
-        print("   ✅ Job endpoints OK")
-
+        # Job endpoints are exercised by the first poll; its failures are reported there
         print("✅ Connection successful!")
         return True
 
     def detect_gpu(self):
         """Detect available GPU on Kaggle"""
-        print("\n💻 Detecting GPU...")
-        try:
-            import torch
-            if torch.cuda.is_available():
-                gpu_name = torch.cuda.get_device_name(0)
-                gpu_memory = torch.cuda.get_device_properties(0).total_memory / (1024**3)
-                print(f"✅ GPU Available: {gpu_name}")
-                print(f"   GPU Memory: {gpu_memory:.2f} GB")
-                print(f"   CUDA Version: {torch.version.cuda}")
-                return {
-                    'available': True,
-                    'name': gpu_name,
-                    'memory_gb': gpu_memory,
-                    'cuda_version': torch.version.cuda
-                }
-            else:
-                print("⚠️ No GPU detected - running on CPU")
-                return {'available': False}
-        except ImportError:
-            print("⚠️ PyTorch not installed - cannot detect GPU")
-            return {'available': False}
+        return _probe_gpu()
 
     def register_worker(self):
         """Register this worker with the TrainForge API"""
@@ -179,6 +188,7 @@ class KaggleGPUWorker:
 
     def send_heartbeat(self):
         """Send periodic heartbeat to API"""
+        next_beat = time.monotonic()
         while self.running:
             try:
                 response = self.make_request('POST', f'/api/workers/{self.worker_id}/heartbeat',
@@ -193,25 +203,105 @@ class KaggleGPUWorker:
             except Exception as e:
                 print(f"⚠️ Heartbeat failed: {e}")
 
-            time.sleep(30)  # Heartbeat every 30 seconds
+            # Heartbeat every 30 seconds on a fixed monotonic schedule, so request
+            # latency doesn't stretch the interval and wall-clock jumps can't skew it
+            next_beat += HEARTBEAT_INTERVAL
+            now = time.monotonic()
+            if next_beat <= now:
+                # Stalled past a beat (slow request, suspended VM) - skip missed beats, no burst
+                next_beat = now + HEARTBEAT_INTERVAL
+            self.stop_event.wait(next_beat - now)
+
+    def send_logs(self):
+        """Drain the log queue, posting up to LOG_BATCH_SIZE lines per request"""
+        carried = None
+        while True:
+            job_id, entry = carried or self.log_queue.get()
+            carried = None
+            if job_id is None:
+                # Flush marker from drain_logs(): everything queued before it has been posted
+                entry.set()
+                self.log_queue.task_done()
+                continue
+            batch = [entry]
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while len(batch) < LOG_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    next_job_id, next_entry = self.log_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if next_job_id != job_id:
+                    carried = (next_job_id, next_entry)
+                    break
+                batch.append(next_entry)
+
+            try:
+                self.make_request('POST', f'/api/jobs/{job_id}/logs/batch',
+                                  json={'logs': batch}, max_retries=1, timeout=5)
+            except Exception:
+                pass  # Don't let logging errors stop training
+            finally:
+                for _ in batch:
+                    self.log_queue.task_done()
+
+    def drain_logs(self, timeout=LOG_DRAIN_TIMEOUT):
+        """Wait (bounded) for queued log lines to ship; drop whatever is left at the deadline"""
+        deadline = time.monotonic() + timeout
+        flushed = threading.Event()
+        try:
+            self.log_queue.put((None, flushed), timeout=timeout)
+        except queue.Full:
+            pass
+        if flushed.wait(max(0.0, deadline - time.monotonic())):
+            return
+
+        # Slow or dead tunnel - don't hold up the job's status and results any longer
+        dropped = 0
+        while True:
+            try:
+                _, entry = self.log_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.log_queue.task_done()
+            if isinstance(entry, threading.Event):
+                entry.set()
+            else:
+                dropped += 1
+        if dropped:
+            print(f"⚠️ Dropped {dropped} unsent log lines (API too slow)")
 
     def poll_for_jobs(self):
         """Poll API for pending jobs"""
         print("\n🔍 Polling for jobs...")
 
-        response = self.make_request('GET', '/api/jobs/pending', max_retries=2)
+        # Express tags JSON responses with an ETag; an unchanged queue comes back as a bodyless 304
+        headers = {'If-None-Match': self.pending_etag} if self.pending_etag else {}
+        response = self.make_request('GET', '/api/jobs/pending',
+                                     params={'wait': POLL_WAIT, 'limit': 1},
+                                     headers=headers, timeout=POLL_WAIT + 5, max_retries=2)
 
-        if not response or response.status_code != 200:
+        if not response:
             return None
 
-        try:
-            jobs = response.json()
-            if isinstance(jobs, list) and len(jobs) > 0:
-                return jobs[0]  # Return first pending job
-            return None
-        except json.JSONDecodeError:
-            print("⚠️ Invalid JSON response from API")
+        if response.status_code == 304:
+            jobs = self.pending_jobs
+        elif response.status_code != 200:
             return None
+        else:
+            try:
+                jobs = response.json()
+            except json.JSONDecodeError:
+                print("⚠️ Invalid JSON response from API")
+                return None
+            self.pending_etag = response.headers.get('ETag')
+            self.pending_jobs = jobs
+
+        if isinstance(jobs, list) and len(jobs) > 0:
+            return jobs[0]  # Return first pending job
+        return None
 
     def claim_job(self, job_id):
         """Claim a job for processing"""
@@ -246,10 +336,9 @@ class KaggleGPUWorker:
 
         # Save zip file
         zip_path = job_dir / 'project.zip'
-        with open(zip_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        with response, open(zip_path, 'wb') as f:
+            response.raw.decode_content = True
+            shutil.copyfileobj(response.raw, f, 1 << 20)
 
         print(f"✅ Downloaded project.zip ({zip_path.stat().st_size / 1024:.1f} KB)")
 
@@ -329,16 +418,16 @@ class KaggleGPUWorker:
                 print(line, end='')
                 sys.stdout.flush()
 
-                # Optionally send logs to API (with error handling)
+                # Queue for the log sender; drop lines rather than stall training
                 try:
-                    self.make_request('POST', f'/api/jobs/{job_id}/logs',
-                                    json={'message': line.strip(), 'timestamp': time.time()},
-                                    max_retries=1, timeout=5)
-                except:
-                    pass  # Don't let logging errors stop training
+                    self.log_queue.put_nowait(
+                        (job_id, {'message': line.strip(), 'timestamp': time.time()}))
+                except queue.Full:
+                    pass
 
             # Wait for completion
             return_code = process.wait()
+            self.drain_logs()
 
             print("="*70)
             if return_code == 0:
@@ -392,14 +481,11 @@ class KaggleGPUWorker:
             with open(results_zip, 'rb') as f:
                 files = {'results_zip': ('results.zip', f, 'application/zip')}
 
-                # Use headers without Content-Type for multipart upload
-                headers = {k: v for k, v in self.headers.items() if k != 'Content-Type'}
-
+                # Session headers carry no Content-Type, so requests sets the multipart boundary
                 response = self.make_request(
                     'POST',
                     f'/api/jobs/{job_id}/results',
                     files=files,
-                    headers=headers,
                     max_retries=3,
                     timeout=120
                 )
@@ -510,6 +596,7 @@ class KaggleGPUWorker:
 
         # Start heartbeat thread
         self.running = True
+        self.stop_event.clear()
         heartbeat_thread = threading.Thread(target=self.send_heartbeat, daemon=True)
         heartbeat_thread.start()
 
@@ -519,22 +606,34 @@ class KaggleGPUWorker:
         # Main polling loop
         try:
             while self.running:
-                # Check for pending jobs
+                # Check for pending jobs (long-poll: the API holds the request until a job arrives)
+                polled_at = time.monotonic()
                 job = self.poll_for_jobs()
 
                 if job:
-                    # Process the job
+                    # Process the job, then poll again right away
                     self.process_job(job)
+                    self.poll_interval = MIN_POLL_INTERVAL
+                elif time.monotonic() - polled_at >= 1.0:
+                    # The server already waited for us - loop straight back into the next poll
+                    self.poll_interval = MIN_POLL_INTERVAL
                 else:
-                    # No jobs - wait before next poll
-                    time.sleep(10)
+                    # Quick empty answer (error, 304, or no long-poll support) - back off with jitter
+                    if self.stop_event.wait(self.poll_interval + random.uniform(0, 0.5 * self.poll_interval)):
+                        break
+                    self.poll_interval = min(self.poll_interval * 1.5, MAX_POLL_INTERVAL)
 
         except KeyboardInterrupt:
             print("\n\n🛑 Worker stopped by user")
-            self.running = False
+            self.stop()
         except Exception as e:
             print(f"\n❌ Worker error: {e}")
-            self.running = False
+            self.stop()
+
+    def stop(self):
+        """Stop the worker; sleeping poll/heartbeat loops return at once"""
+        self.running = False
+        self.stop_event.set()
 
 
 def main():
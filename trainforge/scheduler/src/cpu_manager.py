@@ -13,6 +13,8 @@ import platform
 import json
 from datetime import datetime, timedelta
 
+BASELINE_SAMPLES = 5  # Monitor samples (2s apart) averaged into the performance baseline
+
 class CPUStatus(Enum):
     AVAILABLE = "available"
     ALLOCATED = "allocated"
@@ -83,6 +85,7 @@ class CPUResourceManager:
         # Performance tracking
         self.allocation_history = []
         self.performance_baseline = None
+        self._last_cpu_times = psutil.cpu_times()
         
         # Initialize CPU discovery
         self._discover_cpu_topology()
@@ -151,9 +154,6 @@ class CPUResourceManager:
                 self.nodes[node_id] = node_info
                 print(f"   Node {node_id}: {len(cores)} cores, {memory_gb/nodes_count:.1f}GB RAM")
             
-            # Establish performance baseline
-            self._establish_baseline()
-            
         except Exception as e:
             print(f"❌ CPU discovery failed: {e}")
             self._create_mock_cpu_topology()
@@ -195,16 +195,9 @@ class CPUResourceManager:
             self.nodes[node_id] = node_info
             print(f"   Mock Node {node_id}: {node_config['cores']} cores, {node_config['memory']}GB RAM")
     
-    def _establish_baseline(self):
+    def _establish_baseline(self, baseline_samples: List[CPUMetrics]):
         """Establish performance baseline for comparison"""
         try:
-            # Collect baseline metrics
-            baseline_samples = []
-            for _ in range(5):  # Collect 5 samples over 10 seconds
-                metrics = self._collect_system_metrics()
-                baseline_samples.append(metrics)
-                time.sleep(2)
-            
             # Calculate baseline averages
             if baseline_samples:
                 self.performance_baseline = {
@@ -304,8 +297,9 @@ class CPUResourceManager:
     def _collect_system_metrics(self) -> CPUMetrics:
         """Collect comprehensive system metrics"""
         try:
-            # CPU metrics
-            cpu_usage = psutil.cpu_percent(interval=0.1)
+            # CPU times (also used for the non-blocking utilization delta)
+            cpu_times = psutil.cpu_times()
+            cpu_usage = self._cpu_usage_since_last_sample(cpu_times)
             
             # Memory metrics
             memory = psutil.virtual_memory()
@@ -314,9 +308,6 @@ class CPUResourceManager:
             # Load average
             load_avg = psutil.getloadavg() if hasattr(psutil, 'getloadavg') else (0, 0, 0)
             
-            # CPU times for advanced metrics
-            cpu_times = psutil.cpu_times()
-            
             # Process metrics
             processes = list(psutil.process_iter(['pid', 'status']))
             running_processes = len([p for p in processes if p.info['status'] == 'running'])
@@ -357,11 +348,25 @@ class CPUResourceManager:
                 steal_time_percent=0
             )
     
+    def _cpu_usage_since_last_sample(self, cpu_times) -> float:
+        """CPU utilization from the cpu_times delta since the previous sample (never blocks)"""
+        last = self._last_cpu_times
+        self._last_cpu_times = cpu_times
+        
+        busy = (cpu_times.user - last.user) + (cpu_times.system - last.system)
+        total = sum(cpu_times) - sum(last)
+        return (busy / total * 100) if total > 0 else 0.0
+    
     def _collect_and_store_metrics(self):
         """Collect and store metrics in history"""
         metrics = self._collect_system_metrics()
         self.metrics_history.append(metrics)
         
+        # The first few monitor samples (about 10 seconds) form the baseline,
+        # so startup never blocks waiting for it
+        if self.performance_baseline is None and len(self.metrics_history) >= BASELINE_SAMPLES:
+            self._establish_baseline(self.metrics_history[:BASELINE_SAMPLES])
+        
         # Keep only last 1000 metrics (about 30 minutes at 2s intervals)
         if len(self.metrics_history) > 1000:
             self.metrics_history = self.metrics_history[-1000:]
@@ -24,6 +24,9 @@ try:
 except ImportError:
     from cpu_manager import cpu_manager, CPUAllocation
 
+# Queued by stop() to end the progress reporter once all completions are printed
+_REPORTER_STOP = object()
+
 class ProcessingMode(Enum):
     MULTIPROCESSING = "multiprocessing"
     THREADING = "threading"
@@ -91,6 +94,7 @@ class DistributedProcessor:
         self.mode = mode
         self.task_queue = queue.PriorityQueue()
         self.result_queue = queue.Queue()
+        self.progress_queue = queue.Queue()
         self.workers: Dict[str, WorkerStats] = {}
         self.active_tasks: Dict[str, ProcessingTask] = {}
         self.completed_tasks: Dict[str, ProcessingResult] = {}
@@ -119,6 +123,7 @@ class DistributedProcessor:
         # Coordinator thread
         self.coordinator_thread = None
         self.monitor_thread = None
+        self.reporter_thread = None
         
         # Performance tracking
         self.performance_samples = []
@@ -151,7 +156,7 @@ class DistributedProcessor:
                 self.process_pool = ProcessPoolExecutor(
                     max_workers=max_workers,
                     initializer=self._worker_initializer,
-                    initargs=(cpu_cores,)
+                    initargs=(cpu_cores, multiprocessing.Value('i', 0))
                 )
                 print(f"✅ Process pool created with {max_workers} workers on cores {cpu_cores}")
             else:
@@ -166,12 +171,14 @@ class DistributedProcessor:
         self.running = True
         self.shutdown_requested = False
         
-        # Start coordinator and monitor threads
+        # Start coordinator, monitor and progress reporter threads
         self.coordinator_thread = threading.Thread(target=self._coordinator_loop, daemon=True)
         self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self.reporter_thread = threading.Thread(target=self._reporter_loop, daemon=True)
         
         self.coordinator_thread.start()
         self.monitor_thread.start()
+        self.reporter_thread.start()
         
         print("✅ Distributed processor started successfully")
     
@@ -193,6 +200,11 @@ class DistributedProcessor:
             self.thread_pool.shutdown(wait=True)
             print("✅ Thread pool shutdown complete")
         
+        # Both pools have drained, so every completion message is queued ahead of the sentinel
+        self.progress_queue.put(_REPORTER_STOP)
+        if self.reporter_thread:
+            self.reporter_thread.join()
+        
         # Deallocate CPU resources
         cpu_manager.deallocate_cpus("processor_system")
         
@@ -300,16 +312,33 @@ class DistributedProcessor:
         return "process"
     
     @staticmethod
-    def _worker_initializer(cpu_cores: List[int]):
+    def _worker_initializer(cpu_cores: List[int], worker_counter=None):
         """Initialize worker process with CPU affinity"""
         try:
             worker_id = f"worker_{os.getpid()}"
             
+            # Each worker is pinned to one core, so keep BLAS/OpenMP libraries used by
+            # task code single-threaded instead of oversubscribing that core
+            for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+                os.environ.setdefault(var, "1")
+            
             # Set CPU affinity
             if cpu_cores:
+                # Only pin to cores this process is actually allowed to run on
+                if hasattr(os, "sched_getaffinity"):
+                    allowed = os.sched_getaffinity(0)
+                    cpu_cores = [core for core in cpu_cores if core in allowed] or sorted(allowed)
+                
+                # Hand out cores in worker start order so no two workers share one
+                if worker_counter is not None:
+                    with worker_counter.get_lock():
+                        slot = worker_counter.value
+                        worker_counter.value += 1
+                else:
+                    slot = os.getpid()
+                
                 process = psutil.Process()
-                # Assign cores round-robin style
-                worker_core = cpu_cores[os.getpid() % len(cpu_cores)]
+                worker_core = cpu_cores[slot % len(cpu_cores)]
                 process.cpu_affinity([worker_core])
                 print(f"🔧 Worker {worker_id} initialized with CPU core {worker_core}")
             
@@ -563,7 +592,7 @@ class DistributedProcessor:
                 if result.cpu_time:
                     self.stats["total_cpu_time"] += result.cpu_time
                 
-                print(f"✅ Task {task.task_id} completed in {result.execution_time:.2f}s")
+                self.progress_queue.put(f"✅ Task {task.task_id} completed in {result.execution_time:.2f}s")
             else:
                 self.failed_tasks[task.task_id] = result
                 self.stats["tasks_failed"] += 1
@@ -574,11 +603,19 @@ class DistributedProcessor:
                     print(f"🔄 Retrying task {task.task_id} (attempt {task.retry_count + 1})")
                     self.submit_task(task)
                 else:
-                    print(f"❌ Task {task.task_id} failed permanently: {result.error}")
+                    self.progress_queue.put(f"❌ Task {task.task_id} failed permanently: {result.error}")
         
         except Exception as e:
             print(f"❌ Error handling task completion: {e}")
     
+    def _reporter_loop(self):
+        """Print task progress off the completion path so stdout never stalls result handling"""
+        while True:
+            message = self.progress_queue.get()
+            if message is _REPORTER_STOP:
+                break
+            print(message)
+    
     def _monitor_loop(self):
         """Monitor system performance and worker statistics"""
         print("📊 Monitor loop started")
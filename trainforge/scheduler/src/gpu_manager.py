@@ -45,6 +45,7 @@ class GPUResourceManager:
 
     def __init__(self):
         self.gpus: Dict[int, GPUInfo] = {}
+        self.nvml_handles: Dict[int, Any] = {}  # Filled once by NVML discovery, reused by monitoring
         self.allocations: Dict[str, GPUAllocation] = {}
         self.lock = threading.Lock()
         self.monitoring = True
@@ -78,11 +79,17 @@ class GPUResourceManager:
             device_count = pynvml.nvmlDeviceGetCount()
             print(f"🔍 Found {device_count} GPU(s) via NVML")
 
+            # Published only once every device is discovered, so a failure part-way
+            # (and the nvidia-smi fallback) never leaves a partial handle map behind
+            handles = {}
             for i in range(device_count):
                 handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+                handles[i] = handle
 
-                # Get device info
-                name = pynvml.nvmlDeviceGetName(handle).decode('utf-8')
+                # Get device info (older pynvml returns bytes, nvidia-ml-py returns str)
+                name = pynvml.nvmlDeviceGetName(handle)
+                if isinstance(name, bytes):
+                    name = name.decode('utf-8')
                 mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
 
                 try:
@@ -104,9 +111,9 @@ class GPUResourceManager:
                 gpu_info = GPUInfo(
                     gpu_id=i,
                     name=name,
-                    memory_total_mb=mem_info.total // (1024 * 1024),
-                    memory_used_mb=mem_info.used // (1024 * 1024),
-                    memory_free_mb=mem_info.free // (1024 * 1024),
+                    memory_total_mb=mem_info.total >> 20,
+                    memory_used_mb=mem_info.used >> 20,
+                    memory_free_mb=mem_info.free >> 20,
                     utilization_percent=gpu_util,
                     temperature_celsius=temperature,
                     power_usage_watts=power,
@@ -116,6 +123,8 @@ class GPUResourceManager:
                 self.gpus[i] = gpu_info
                 print(f"   GPU {i}: {name} ({gpu_info.memory_total_mb}MB)")
 
+            self.nvml_handles = handles
+
         except ImportError:
             raise ImportError("pynvml not available")
 
@@ -221,6 +230,11 @@ class GPUResourceManager:
 
     def _update_gpu_status(self):
         """Update GPU status from nvidia-ml-py or nvidia-smi"""
+        if not self.nvml_handles:
+            # Discovered without NVML (nvidia-smi or mock) - no live source to poll
+            self._update_mock_gpu_status()
+            return
+
         try:
             # Try to update with real data
             self._update_real_gpu_status()
@@ -234,12 +248,12 @@ class GPUResourceManager:
             import pynvml
 
             for gpu_id, gpu_info in self.gpus.items():
-                handle = pynvml.nvmlDeviceGetHandleByIndex(gpu_id)
+                handle = self.nvml_handles[gpu_id]
 
                 # Update memory info
                 mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                gpu_info.memory_used_mb = mem_info.used // (1024 * 1024)
-                gpu_info.memory_free_mb = mem_info.free // (1024 * 1024)
+                gpu_info.memory_used_mb = mem_info.used >> 20
+                gpu_info.memory_free_mb = mem_info.free >> 20
 
                 # Update utilization
                 try:
@@ -364,6 +378,12 @@ class GPUResourceManager:
 
             return available_count >= num_gpus
 
+    def get_available_gpu_memory(self) -> List[int]:
+        """Free memory (MB) of each GPU that is currently available, as one snapshot"""
+        with self.lock:
+            return [gpu_info.memory_free_mb for gpu_info in self.gpus.values()
+                    if gpu_info.status == GPUStatus.AVAILABLE]
+
     def get_gpu_status(self) -> Dict[str, Any]:
         """Get overall GPU cluster status"""
         with self.lock:
@@ -12,6 +12,7 @@ import psutil
 import signal
 import os
 import sys
+from functools import lru_cache
 
 # Add scheduler modules to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../scheduler/src'))
@@ -19,6 +20,14 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../../scheduler/src'))
 from gpu_manager import gpu_manager
 from job_scheduler import job_scheduler, JobRequest, JobPriority
 
+@lru_cache(maxsize=None)
+def _static_system_info():
+    """CPU count and total memory never change at runtime, so query them once"""
+    return {
+        "cpu_count": psutil.cpu_count(),
+        "memory_total": psutil.virtual_memory().total >> 20,  # MB
+    }
+
 class GPUWorker:
     """Enhanced worker with GPU orchestration capabilities"""
     
@@ -136,9 +145,8 @@ class GPUWorker:
     def _get_system_info(self):
         """Get system information"""
         return {
-            "cpu_count": psutil.cpu_count(),
-            "memory_total": psutil.virtual_memory().total // (1024 * 1024),  # MB
-            "disk_free": psutil.disk_usage('/').free // (1024 * 1024 * 1024),  # GB
+            **_static_system_info(),
+            "disk_free": psutil.disk_usage('/').free >> 30,  # GB
             "platform": sys.platform,
             "python_version": sys.version
         }
@@ -183,9 +191,12 @@ class GPUWorker:
                 data = response.json()
                 jobs = data.get('jobs', [])
                 
+                # Snapshot GPU availability once per poll instead of once per job
+                free_gpu_memory = gpu_manager.get_available_gpu_memory()
+                
                 # Find suitable pending jobs
                 for job in jobs:
-                    if job['status'] == 'pending' and self._can_handle_job(job):
+                    if job['status'] == 'pending' and self._can_handle_job(job, free_gpu_memory):
                         return job
             
             return None
@@ -194,21 +205,21 @@ class GPUWorker:
             print(f"⚠️ Failed to fetch jobs: {e}")
             return None
     
-    def _can_handle_job(self, job):
+    def _can_handle_job(self, job, free_gpu_memory):
         """Check if worker can handle this job based on resources"""
         try:
-            resources = job.get('resources', {})
+            resources = job.get('resources') or {}
             gpu_required = resources.get('gpu', 1)
             memory_per_gpu = resources.get('memory_per_gpu', 4096)
             
-            # Check if we have enough available GPUs
-            available_gpus = gpu_manager.get_available_gpus(memory_per_gpu)
+            # Check if we have enough available GPUs (free_gpu_memory is the per-poll snapshot)
+            available_gpus = sum(1 for free_mb in free_gpu_memory if free_mb >= memory_per_gpu)
             
-            if len(available_gpus) >= gpu_required:
-                print(f"✅ Can handle job {job['job_id']} - Need {gpu_required} GPU(s), have {len(available_gpus)} available")
+            if available_gpus >= gpu_required:
+                print(f"✅ Can handle job {job['job_id']} - Need {gpu_required} GPU(s), have {available_gpus} available")
                 return True
             else:
-                print(f"⚠️ Cannot handle job {job['job_id']} - Need {gpu_required} GPU(s), only {len(available_gpus)} available")
+                print(f"⚠️ Cannot handle job {job['job_id']} - Need {gpu_required} GPU(s), only {available_gpus} available")
                 return False
                 
         except Exception as e:
@@ -356,10 +367,13 @@ class GPUWorker:
     
     def _monitor_resources(self):
         """Monitor system resources and GPU status"""
+        # Prime the counter so each non-blocking read covers the previous interval
+        psutil.cpu_percent(interval=None)
+        
         while self.running:
             try:
                 # Get current resource usage
-                cpu_percent = psutil.cpu_percent(interval=1)
+                cpu_percent = psutil.cpu_percent(interval=None)
                 memory = psutil.virtual_memory()
                 gpu_status = gpu_manager.get_gpu_status()
                 
@@ -367,7 +381,7 @@ class GPUWorker:
                 if int(time.time()) % 60 == 0:  # Every minute
                     print(f"📊 Resource Status:")
                     print(f"   CPU: {cpu_percent:.1f}%")
-                    print(f"   Memory: {memory.percent:.1f}% ({memory.used // (1024**3):.1f}GB / {memory.total // (1024**3):.1f}GB)")
+                    print(f"   Memory: {memory.percent:.1f}% ({memory.used >> 30:.1f}GB / {memory.total >> 30:.1f}GB)")
                     print(f"   GPUs: {gpu_status['allocated_gpus']}/{gpu_status['total_gpus']} allocated")
                     print(f"   Active Jobs: {len(self.current_jobs)}")
                 
@@ -4,6 +4,7 @@
 import time
 import json
 import requests
+from requests.adapters import HTTPAdapter
 import subprocess
 import sys
 import os
@@ -11,26 +12,38 @@ import zipfile
 import tempfile
 import shutil
 from pathlib import Path
-from datetime import datetime
 import signal
+import socket
 import threading
 
+POLL_WAIT = 25  # seconds the API may hold a /pending long-poll open
+LOG_BATCH_SIZE = 50
+LOG_FLUSH_INTERVAL = 1.0
+
 class TrainForgeWorker:
     """Main worker class that processes training jobs"""
     
-    def __init__(self, api_url="http://localhost:3000"):
+    def __init__(self, api_url="http://localhost:3000", worker_id=None):
         self.api_url = api_url.rstrip('/')
+        self.worker_id = worker_id or f"local-{socket.gethostname()}-{os.getpid()}"
         self.running = True
         self.current_job = None
         self.work_dir = Path("./work")
         self.work_dir.mkdir(exist_ok=True)
         
+        # Reuse keep-alive connections across polls, status updates and logs
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
         
         print("🤖 TrainForge Worker initialized")
         print(f"📡 API URL: {self.api_url}")
+        print(f"🆔 Worker ID: {self.worker_id}")
         print(f"📁 Work directory: {self.work_dir.absolute()}")
     
     def _signal_handler(self, signum, frame):
@@ -40,8 +53,8 @@ class TrainForgeWorker:
         
         if self.current_job:
             print(f"📋 Cancelling current job: {self.current_job}")
-            self._update_job_status(self.current_job, "cancelled", 
-                                  error_message="Worker shutdown during execution")
+            self._update_job_status(self.current_job, "cancelled",
+                                  message="Worker shutdown during execution")
     
     def start(self):
         """Start the worker main loop"""
@@ -57,14 +70,16 @@ class TrainForgeWorker:
         
         while self.running:
             try:
-                # Poll for pending jobs
+                # Poll for pending jobs (long-poll: the API holds the request until one arrives)
+                polled_at = time.monotonic()
                 job = self._get_next_job()
                 
-                if job:
+                # Claiming flips the job to running, so /pending stops handing it out
+                if job and self._claim_job(job['job_id']):
                     print(f"\n📥 Found job: {job['job_id']}")
                     self._process_job(job)
-                else:
-                    # No jobs available, wait before polling again
+                elif time.monotonic() - polled_at < 1:
+                    # API answered without waiting (error, lost claim, or no long-poll support)
                     time.sleep(5)
                     
             except KeyboardInterrupt:
@@ -79,7 +94,7 @@ class TrainForgeWorker:
     def _check_api_health(self):
         """Check if API server is running"""
         try:
-            response = requests.get(f"{self.api_url}/health", timeout=5)
+            response = self.session.get(f"{self.api_url}/health", timeout=5)
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
@@ -87,14 +102,12 @@ class TrainForgeWorker:
     def _get_next_job(self):
         """Get the next pending job from the API"""
         try:
-            response = requests.get(f"{self.api_url}/api/jobs?limit=1")
+            response = self.session.get(f"{self.api_url}/api/jobs/pending",
+                                        params={'wait': POLL_WAIT}, timeout=POLL_WAIT + 5)
             if response.status_code == 200:
-                data = response.json()
-                jobs = data.get('jobs', [])
-                
-                # Find first pending job
-                for job in jobs:
-                    if job['status'] == 'pending':
+                # Distributed jobs need torchrun ranks; leave them to the GPU workers
+                for job in response.json():
+                    if not job.get('is_distributed'):
                         return job
                         
             return None
@@ -103,6 +116,18 @@ class TrainForgeWorker:
             print(f"⚠️ Failed to fetch jobs: {e}")
             return None
     
+    def _claim_job(self, job_id):
+        """Claim a pending job so no other worker picks it up"""
+        try:
+            response = self.session.post(f"{self.api_url}/api/jobs/{job_id}/claim",
+                                         json={'worker_id': self.worker_id}, timeout=30)
+            if response.status_code == 200:
+                return True
+            print(f"⚠️ Failed to claim job {job_id}: {response.text}")
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Failed to claim job {job_id}: {e}")
+        return False
+    
     def _process_job(self, job):
         """Process a single training job"""
         job_id = job['job_id']
@@ -113,8 +138,7 @@ class TrainForgeWorker:
             print(f"📁 Project: {job['project_name']}")
             print(f"🐍 Script: {job['training_script']}")
             
-            # Update job status to running
-            self._update_job_status(job_id, "running", started_at=datetime.now().isoformat())
+            # The claim already marked the job running
             self._add_job_log(job_id, "Job started by worker")
             
             # Create job workspace
@@ -131,23 +155,18 @@ class TrainForgeWorker:
             
             if success:
                 print("✅ Training completed successfully")
-                self._update_job_status(job_id, "completed", 
-                                      progress=100, 
-                                      completed_at=datetime.now().isoformat())
+                self._update_job_status(job_id, "completed")
                 self._add_job_log(job_id, "Training completed successfully")
             else:
                 print("❌ Training failed")
-                self._update_job_status(job_id, "failed", 
-                                      completed_at=datetime.now().isoformat())
+                self._update_job_status(job_id, "failed", message="Training script failed")
             
             # Cleanup
             self._cleanup_job_files(job_dir)
             
         except Exception as e:
             print(f"❌ Job processing failed: {e}")
-            self._update_job_status(job_id, "failed", 
-                                  error_message=str(e),
-                                  completed_at=datetime.now().isoformat())
+            self._update_job_status(job_id, "failed", message=str(e))
             self._add_job_log(job_id, f"Job failed: {str(e)}")
         
         finally:
@@ -200,7 +219,9 @@ class TrainForgeWorker:
                 errors='replace'  # Replace problematic characters
             )
             
-            # Stream output in real-time
+            # Stream output in real-time, shipping logs in batches
+            pending_logs = []
+            last_flush = time.monotonic()
             while True:
                 output = process.stdout.readline()
                 if output == '' and process.poll() is not None:
@@ -208,7 +229,13 @@ class TrainForgeWorker:
                 if output:
                     clean_output = output.strip()
                     print(f"[TRAINING] {clean_output}")
-                    self._add_job_log(job['job_id'], clean_output)
+                    pending_logs.append(clean_output)
+                if pending_logs and (len(pending_logs) >= LOG_BATCH_SIZE or
+                                     time.monotonic() - last_flush >= LOG_FLUSH_INTERVAL):
+                    self._add_job_logs(job['job_id'], pending_logs)
+                    pending_logs = []
+                    last_flush = time.monotonic()
+            self._add_job_logs(job['job_id'], pending_logs)
             
             # Get the exit code
             return_code = process.poll()
@@ -222,11 +249,14 @@ class TrainForgeWorker:
         finally:
             os.chdir(original_cwd)
     
-    def _update_job_status(self, job_id, status, **kwargs):
-        """Update job status in the database"""
+    def _update_job_status(self, job_id, status, message=None):
+        """Update job status through the worker-facing status endpoint"""
         try:
-            data = {"status": status, **kwargs}
-            response = requests.put(f"{self.api_url}/api/jobs/{job_id}", json=data)
+            data = {"status": status}
+            if message:
+                data["message"] = message
+            response = self.session.put(f"{self.api_url}/api/jobs/{job_id}/status",
+                                        json=data, timeout=30)
             if response.status_code == 200:
                 print(f"📝 Job status updated: {status}")
             else:
@@ -236,13 +266,19 @@ class TrainForgeWorker:
     
     def _add_job_log(self, job_id, message):
         """Add a log entry to the job"""
+        self._add_job_logs(job_id, [message])
+    
+    def _add_job_logs(self, job_id, messages):
+        """Add several log entries to the job in one request"""
         try:
             # Skip empty messages
-            if not message or not message.strip():
+            now = time.time()
+            logs = [{"message": m.strip(), "timestamp": now} for m in messages if m and m.strip()]
+            if not logs:
                 return
                 
-            data = {"message": message.strip()}
-            response = requests.post(f"{self.api_url}/api/jobs/{job_id}/logs", json=data)
+            response = self.session.post(f"{self.api_url}/api/jobs/{job_id}/logs/batch",
+                                         json={"logs": logs}, timeout=30)
             if response.status_code != 200:
                 print(f"⚠️ Failed to add log: {response.text}")
         except Exception as e: